@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截屏智能卡片生成器 - 轻量启动器
+供 iOS 快捷指令等单次触发场景使用：只依赖标准库，把截图路径交给常驻 worker
+（python main.py --serve）处理；worker 未启动时回退为直接运行 main.py。
+"""
+
+import os
+import sys
+import json
+import socket
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+SOCKET_PATH = os.environ.get('READ_SCREEN_SOCKET', str(SCRIPT_DIR / 'output' / 'worker.sock'))
+
+
+def send_request(images):
+    """
+    发送请求到常驻 worker，返回响应；无法连接 worker 时返回 None
+
+    请求一旦发出，worker 可能已处理了部分图片，此时连接中断只返回错误，
+    不再回退重跑，避免重复调用 API、重复生成卡片。
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(SOCKET_PATH)
+        except OSError:
+            # socket 不存在或已失效（worker 未启动）
+            return None
+        try:
+            sock.sendall((json.dumps({'images': images}, ensure_ascii=False) + '\n').encode('utf-8'))
+            with sock.makefile('rb') as f:
+                return json.loads(f.readline())
+        except (OSError, json.JSONDecodeError) as e:
+            return {'ok': False, 'error': f"worker 连接中断，未返回完整结果（部分图片可能已处理）: {e}"}
+
+
+def main():
+    """命令行入口"""
+    images = [os.path.abspath(p) for p in sys.argv[1:]]
+    if not images:
+        print("使用方法: python launcher.py <图片路径> [图片路径...]")
+        sys.exit(1)
+
+    response = send_request(images)
+    if response is None:
+        # worker 未启动，回退为直接运行
+        main_path = str(SCRIPT_DIR / 'main.py')
+        os.execv(sys.executable, [sys.executable, main_path, *images])
+
+    if not response['ok']:
+        print(f"❌ 错误: {response.get('error') or response.get('failed')}")
+        sys.exit(1)
+    for card in response['cards']:
+        print(card)
+
+
+if __name__ == '__main__':
+    main()
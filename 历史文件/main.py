@@ -5,26 +5,74 @@
 单图输入 → AI 分析 → 生成知识卡片
 """
 
+import io
 import os
 import sys
 import json
+import time
 import base64
-import webbrowser
-import shutil
+import hashlib
+import signal
+import argparse
+import threading
+from collections import deque, namedtuple
 from datetime import datetime
+from functools import lru_cache, partial
+from itertools import repeat
 from pathlib import Path
-from openai import OpenAI
-from jinja2 import Template
 
-# 导入图片压缩模块
-from compress_images import compress_image, format_size
+# 注意：openai / jinja2 / PIL / webbrowser / 多进程等较重的依赖都在用到时才导入，
+# 快捷指令单次触发时不必为用不到的模块付出启动时间。
+
+# 常驻 worker 的默认 Unix socket 路径（launcher.py 使用同一路径）
+DEFAULT_SOCKET_PATH = Path(os.environ.get('READ_SCREEN_SOCKET', Path(__file__).parent / 'output' / 'worker.sock'))
+
+# 批量处理日志的默认目录（每批输入一个日志文件）
+DEFAULT_JOURNAL_DIR = Path(__file__).parent / 'output' / 'journals'
+
+# API 响应录制 / 回放文件的默认目录
+DEFAULT_CASSETTE_DIR = Path(__file__).parent / 'output' / 'cassettes'
+
+# API 响应录制 / 回放模式
+CASSETTE_MODES = ('off', 'record', 'replay')
+
+# 支持的图片扩展名（不区分大小写）
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# 一张待处理的截图：key 为唯一标识（用于进度日志），name 为显示名称（用于输出文件名），
+# read() 返回图片数据。图片可能来自磁盘文件，也可能是 zip 包中的成员。
+# 注意：zip 成员的 read() 依赖产出它的迭代器保持打开，必须在迭代器继续前进或关闭之前调用。
+ImageSource = namedtuple('ImageSource', ['key', 'name', 'read'])
+
+_config_cache = {}
 
 
 def load_config():
-    """加载配置文件"""
+    """加载配置文件（按修改时间缓存，常驻进程中修改 config.json 后自动重新加载）"""
     config_path = Path(__file__).parent / 'config.json'
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    mtime = config_path.stat().st_mtime
+    if _config_cache.get('mtime') != mtime:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            _config_cache['config'] = json.load(f)
+        _config_cache['mtime'] = mtime
+    return _config_cache['config']
+
+
+@lru_cache(maxsize=None)
+def get_client(api_key, base_url):
+    """获取 OpenAI 兼容客户端（同一配置复用同一客户端及其连接池）"""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+def format_size(size):
+    """格式化文件大小"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
 
 
 def encode_image(image_path):
@@ -33,6 +81,202 @@ def encode_image(image_path):
         return base64.b64encode(f.read()).decode('utf-8')
 
 
+def read_file(path):
+    """读取文件全部内容"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def is_image_name(name):
+    """判断是否为图片文件（扩展名不区分大小写，排除 macOS 的 AppleDouble ._* 文件）"""
+    basename = name.rsplit('/', 1)[-1]
+    return not basename.startswith('._') and os.path.splitext(basename)[1].lower() in IMAGE_EXTENSIONS
+
+
+def is_archive(path):
+    """判断是否为 zip 压缩包"""
+    return str(path).lower().endswith('.zip')
+
+
+def get_zip_member_name(info):
+    """
+    获取 zip 成员的文件名
+
+    macOS 打包的 zip 常以 UTF-8 保存文件名却不设置 UTF-8 标志位（0x800），
+    zipfile 会按 cp437 解码成乱码，这里还原为 UTF-8。
+    """
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('utf-8')
+    except UnicodeError:
+        return info.filename
+
+
+def iter_zip_sources(archive_path):
+    """
+    逐个产出 zip 包中的图片，不解压到磁盘
+
+    每个成员在 read() 时才读取，同一时刻内存中只保留正在处理的图片。
+    压缩包在迭代结束前保持打开，因此 read() 需在迭代过程中调用。
+    """
+    import zipfile
+
+    archive_path = os.path.abspath(archive_path)
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = get_zip_member_name(info)
+            if info.is_dir() or name.startswith('__MACOSX/') or not is_image_name(name):
+                continue
+            yield ImageSource(f"{archive_path}!/{name}", name, partial(archive.read, info))
+
+
+def iter_image_sources(inputs):
+    """
+    把命令行输入展开为图片流
+
+    支持单个图片文件、目录（递归查找，其中的 zip 包也会展开）和 zip 压缩包。
+    产出的 ImageSource 需在迭代器前进或关闭前 read()，不能先 list() 再读取。
+    """
+    for input_path in inputs:
+        input_path = Path(input_path)
+        if input_path.is_dir():
+            for path in sorted(input_path.rglob('*')):
+                if '__MACOSX' in path.parts or not path.is_file():
+                    continue
+                if is_archive(path):
+                    yield from iter_zip_sources(path)
+                elif is_image_name(path.name):
+                    yield ImageSource(os.path.abspath(path), str(path), partial(read_file, path))
+        elif is_archive(input_path):
+            yield from iter_zip_sources(input_path)
+        elif input_path.is_file():
+            yield ImageSource(os.path.abspath(input_path), str(input_path), partial(read_file, input_path))
+        else:
+            print(f"⚠️  输入不存在，已跳过: {input_path}")
+
+
+def get_worker_count(config):
+    """获取预处理进程数（默认使用当前进程可用的全部 CPU 核心）"""
+    workers = config['processing'].get('workers')
+    if workers:
+        return max(1, int(workers))
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def preprocess_image_bytes(image_bytes, processing_config):
+    """
+    图片预处理：解码 → 缩放 → JPEG 编码
+
+    纯 CPU 计算，全程在内存中处理 bytes，可直接在子进程中运行。
+
+    Args:
+        image_bytes: 原始图片数据
+        processing_config: config['processing'] 配置
+
+    Returns:
+        (processed_bytes, original_size, processed_size, compressed)
+    """
+    original_size = len(image_bytes)
+
+    # 智能判断：如果图片已经很小，跳过压缩
+    size_threshold_mb = processing_config.get('skip_compress_threshold_mb', 0.5)  # 默认500KB
+    if original_size <= size_threshold_mb * 1024 * 1024:
+        return image_bytes, original_size, original_size, False
+
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail(
+            (processing_config['target_width'], processing_config['target_height']),
+            Image.LANCZOS
+        )
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=processing_config['compress_quality'], optimize=True)
+
+    processed_bytes = buffer.getvalue()
+    return processed_bytes, original_size, len(processed_bytes), True
+
+
+def iter_preprocessed(sources, config, workers=None):
+    """
+    在进程池中并行预处理图片，按输入顺序逐个产出结果
+
+    调用方处理第 N 张图（如调用 API）时，后续图片已在子进程中压缩。
+    同时在途的图片数量有上限，内存占用不随批量大小增长。
+
+    Yields:
+        (source, future)：future.result() 为 preprocess_image_bytes 的返回值，
+        读取或预处理失败时抛出对应异常
+    """
+    workers = workers or get_worker_count(config)
+    prefetch = workers * 2
+    processing_config = config['processing']
+    sources = iter(sources)
+    pending = deque()
+
+    def submit_next():
+        for source in sources:
+            try:
+                image_bytes = source.read()
+            except Exception as e:
+                # 读取失败同样交给调用方按失败处理
+                future = Future()
+                future.set_exception(e)
+            else:
+                future = pool.submit(preprocess_image_bytes, image_bytes, processing_config)
+            pending.append((source, future))
+            return
+
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    # 子进程忽略 Ctrl-C，由主进程统一处理中断
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=signal.signal,
+                               initargs=(signal.SIGINT, signal.SIG_IGN))
+    try:
+        for _ in range(prefetch):
+            submit_next()
+        while pending:
+            source, future = pending.popleft()
+            submit_next()
+            yield source, future
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def benchmark_preprocess(sources, config, worker_counts=None):
+    """
+    预处理性能测试：分别用 1 / 4 / 全部核心压缩同一批图片，输出每秒处理张数
+
+    所有图片都会强制走完整的 解码 → 缩放 → 编码 流程（不跳过小图）。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    images = [source.read() for source in sources]
+    processing_config = dict(config['processing'], skip_compress_threshold_mb=0)
+
+    if worker_counts is None:
+        worker_counts = sorted({1, 4, get_worker_count(config)})
+
+    print(f"\n⏱️  预处理性能测试: {len(images)} 张图片")
+    results = {}
+    for workers in worker_counts:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # 预热：先拉起所有子进程，避免把进程启动时间计入结果
+            list(pool.map(abs, range(workers)))
+            start = time.perf_counter()
+            list(pool.map(preprocess_image_bytes, images, repeat(processing_config)))
+            elapsed = time.perf_counter() - start
+        results[workers] = len(images) / elapsed if elapsed else float('inf')
+        print(f"   {workers:>3} 核: {results[workers]:.1f} 张/秒 ({elapsed:.2f}s)")
+
+    return results
+
+
 def load_few_shot_examples():
     """加载 Few-Shot 示例"""
     examples_path = Path(__file__).parent / 'prompt_examples.json'
@@ -44,8 +288,9 @@ def load_few_shot_examples():
         return None
 
 
+@lru_cache(maxsize=1)
 def get_prompt():
-    """获取 AI 分析的 Prompt"""
+    """获取 AI 分析的 Prompt（进程内只构建一次）"""
     # 加载 Few-Shot 示例
     examples_data = load_few_shot_examples()
 
@@ -268,51 +513,129 @@ def get_prompt():
 5. 严格按照 JSON 格式输出，不要有任何额外文字""" + extra_examples
 
 
-def analyze_screenshot(image_path, config):
-    """使用 AI Vision API 分析截图"""
-    print(f"\n🔍 正在分析截图: {os.path.basename(image_path)}")
+def get_request_fingerprint(request):
+    """请求指纹：对完整请求参数（模型、Prompt、图片等）做 sha256，相同请求得到相同指纹"""
+    payload = json.dumps(request, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
 
-    # 读取图片文件
-    with open(image_path, 'rb') as f:
-        image_data = base64.standard_b64encode(f.read()).decode('utf-8')
+
+def get_cassette_mode(config):
+    """获取录制 / 回放模式，拼写错误等未知模式直接报错，避免误调用付费 API"""
+    mode = config['api'].get('cassette', {}).get('mode', 'off')
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"未知的 api.cassette.mode: {mode!r}，可选值: {', '.join(CASSETTE_MODES)}")
+    return mode
+
+
+def request_completion(request, config):
+    """
+    调用 Vision API，返回原始响应（dict）
+
+    根据 config['api']['cassette'] 的 mode 决定行为：
+    - off（默认）：直接调用 API
+    - record：调用 API，并把请求指纹和原始响应（含 usage）保存到录制目录
+    - replay：不调用 API，从录制目录读取相同指纹的响应；可用 replay_latency_s
+      模拟网络延迟（数字为固定秒数，"recorded" 为录制时的实际耗时）
+    """
+    cassette = config['api'].get('cassette', {})
+    mode = get_cassette_mode(config)
+    cassette_dir = Path(cassette.get('dir', DEFAULT_CASSETTE_DIR))
+    fingerprint = get_request_fingerprint(request)
+    cassette_path = cassette_dir / f"{fingerprint}.json"
+
+    if mode == 'replay':
+        if not cassette_path.exists():
+            raise FileNotFoundError(f"未找到录制的响应: {cassette_path}")
+        with open(cassette_path, 'r', encoding='utf-8') as f:
+            recorded = json.load(f)
+        print(f"📼 回放 API 响应: {fingerprint[:12]}")
+
+        latency = cassette.get('replay_latency_s', 0)
+        if latency == 'recorded':
+            latency = recorded['elapsed_s']
+        if latency:
+            time.sleep(latency)
+        return recorded['response']
 
     # 创建 OpenAI 兼容客户端（DeepSeek）
-    client = OpenAI(
-        api_key=config['api']['api_key'],
-        base_url=config['api']['base_url']
-    )
+    client = get_client(config['api']['api_key'], config['api']['base_url'])
+
+    # 调用 DeepSeek API
+    print(f"📡 调用 {config['api']['provider'].upper()} API...")
+    print(f"   Base URL: {config['api']['base_url']}")
+    print(f"   Model: {config['api']['model']}")
+
+    start = time.perf_counter()
+    response = client.chat.completions.create(**request).model_dump()
+    elapsed = time.perf_counter() - start
+
+    if mode == 'record':
+        cassette_dir.mkdir(parents=True, exist_ok=True)
+        # 请求中的图片 base64 体积较大，只保存其摘要
+        image_url = request['messages'][0]['content'][0]['image_url']['url']
+        recorded = {
+            'fingerprint': fingerprint,
+            'request': {
+                'model': request['model'],
+                'max_tokens': request['max_tokens'],
+                'temperature': request['temperature'],
+                'image_sha256': hashlib.sha256(image_url.encode('utf-8')).hexdigest(),
+                'prompt_sha256': hashlib.sha256(request['messages'][0]['content'][1]['text'].encode('utf-8')).hexdigest(),
+            },
+            'response': response,
+            'elapsed_s': round(elapsed, 3),
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        # 先写临时文件再原子替换，录制中途崩溃不会留下损坏的回放文件
+        temp_path = cassette_path.with_name(cassette_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(recorded, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, cassette_path)
+        print(f"📼 已录制 API 响应: {fingerprint[:12]}")
 
-    try:
-        # 调用 DeepSeek API
-        print(f"📡 调用 {config['api']['provider'].upper()} API...")
-        print(f"   Base URL: {config['api']['base_url']}")
-        print(f"   Model: {config['api']['model']}")
-
-        response = client.chat.completions.create(
-            model=config['api']['model'],
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_data}"
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": get_prompt()
+    return response
+
+
+def analyze_screenshot(image_path, config, image_bytes=None):
+    """使用 AI Vision API 分析截图（传入 image_bytes 时不再读取文件）"""
+    print(f"\n🔍 正在分析截图: {os.path.basename(image_path)}")
+
+    # 读取图片文件
+    if image_bytes is None:
+        with open(image_path, 'rb') as f:
+            image_bytes = f.read()
+    image_data = base64.standard_b64encode(image_bytes).decode('utf-8')
+
+    request = {
+        'model': config['api']['model'],
+        'messages': [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_data}"
                         }
-                    ]
-                }
-            ],
-            max_tokens=config['api']['max_tokens'],
-            temperature=config['api']['temperature']
-        )
+                    },
+                    {
+                        "type": "text",
+                        "text": get_prompt()
+                    }
+                ]
+            }
+        ],
+        'max_tokens': config['api']['max_tokens'],
+        'temperature': config['api']['temperature'],
+    }
+
+    try:
+        response = request_completion(request, config)
 
         # 提取返回的 JSON 内容
-        content = response.choices[0].message.content
+        content = response['choices'][0]['message']['content']
 
         # 清理可能的 markdown 代码块标记
         content = content.strip()
@@ -340,8 +663,20 @@ def analyze_screenshot(image_path, config):
         raise
 
 
-def generate_card_html(analysis, image_path, config):
-    """生成卡片 HTML"""
+def get_output_stem(image_path, source_key=None):
+    """
+    输出文件名前缀：原始文件名 + 来源短哈希 + 时间戳
+
+    目录和 zip 包中常有同名文件（如 a/IMG_0001.jpg 与 b/IMG_0001.jpg），
+    加入来源标识（source_key，默认为图片绝对路径）的哈希，避免同一秒内生成的卡片互相覆盖。
+    """
+    digest = hashlib.sha256((source_key or os.path.abspath(image_path)).encode('utf-8')).hexdigest()[:8]
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')  # 格式: 20241124_153045
+    return f"{Path(image_path).stem}_{digest}_{timestamp}"
+
+
+def generate_card_html(analysis, image_path, config, output_stem=None):
+    """生成卡片 HTML（output_stem 为输出文件名前缀，默认由 get_output_stem 生成）"""
     print("\n📝 生成卡片 HTML...")
 
     # 读取模板
@@ -356,6 +691,8 @@ def generate_card_html(analysis, image_path, config):
             template_content = f.read()
 
     # 渲染模板
+    from jinja2 import Template
+
     template = Template(template_content)
     html = template.render(
         analysis=analysis,
@@ -364,9 +701,7 @@ def generate_card_html(analysis, image_path, config):
     )
 
     # 生成带时间戳和原始文件名的输出文件名
-    original_filename = Path(image_path).stem  # 获取不带扩展名的文件名
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')  # 格式: 20241124_153045
-    output_filename = f"{original_filename}_{timestamp}.html"
+    output_filename = f"{output_stem or get_output_stem(image_path)}.html"
 
     # 保存 HTML
     output_path = Path(__file__).parent / 'output' / output_filename
@@ -639,13 +974,16 @@ def create_default_template():
 </html>"""
 
 
-def process_screenshot(image_path, config):
+def process_screenshot(image_path, config, preprocessed=None, open_browser=True, source_key=None):
     """
     主处理流程：单图 → 卡片
 
     Args:
-        image_path: 截图路径
+        image_path: 截图路径（传入 preprocessed 时仅用作显示名称和输出文件名）
         config: 配置对象
+        preprocessed: 已完成的预处理结果（批量模式由进程池提供），为空时读取 image_path 并在当前进程处理
+        open_browser: 是否按 auto_open_browser 配置打开浏览器（批量模式关闭，避免每张图打开一个标签页）
+        source_key: 图片来源的唯一标识（ImageSource.key），用于区分同名图片的输出文件
 
     Returns:
         card_html_path: 生成的卡片 HTML 路径
@@ -655,52 +993,37 @@ def process_screenshot(image_path, config):
     print("="*60)
 
     # 1. 检查文件是否存在
-    if not os.path.exists(image_path):
+    if preprocessed is None and not os.path.exists(image_path):
         raise FileNotFoundError(f"图片不存在: {image_path}")
 
     print(f"\n📂 输入文件: {os.path.basename(image_path)}")
-    original_size = os.path.getsize(image_path)
-    print(f"   文件大小: {format_size(original_size)}")
 
-    # 2. 图片预处理（智能压缩）
+    # 2. 图片预处理（智能压缩，全程在内存中完成，不写临时文件）
     print("\n[1/3] 图片预处理...")
-    temp_path = Path(__file__).parent / 'output' / 'temp_compressed.jpg'
-
-    # 智能判断：如果图片已经很小，跳过压缩
-    size_threshold_mb = config['processing'].get('skip_compress_threshold_mb', 0.5)  # 默认500KB
-    size_threshold_bytes = size_threshold_mb * 1024 * 1024
-
-    if original_size <= size_threshold_bytes:
+    if preprocessed is None:
+        with open(image_path, 'rb') as f:
+            preprocessed = preprocess_image_bytes(f.read(), config['processing'])
+    image_bytes, orig_size, compressed_size, compressed = preprocessed
+    print(f"   文件大小: {format_size(orig_size)}")
+
+    if not compressed:
+        size_threshold_mb = config['processing'].get('skip_compress_threshold_mb', 0.5)
         print(f"   图片已足够小 (<{size_threshold_mb}MB)，跳过压缩")
-        # 直接复制原图
-        shutil.copy2(image_path, temp_path)
-        processing_path = temp_path
     else:
-        # 需要压缩
-        print(f"   图片较大 (>{size_threshold_mb}MB)，开始压缩...")
-        orig_size, compressed_size = compress_image(
-            image_path,
-            str(temp_path),
-            quality=config['processing']['compress_quality'],
-            max_width=config['processing']['target_width'],
-            max_height=config['processing']['target_height']
-        )
-
-        if orig_size and compressed_size:
-            ratio = (1 - compressed_size / orig_size) * 100
-            print(f"   压缩完成: {format_size(orig_size)} → {format_size(compressed_size)} (减少 {ratio:.1f}%)")
-        processing_path = temp_path
+        ratio = (1 - compressed_size / orig_size) * 100
+        print(f"   压缩完成: {format_size(orig_size)} → {format_size(compressed_size)} (减少 {ratio:.1f}%)")
 
     # 3. AI 分析
     print("\n[2/3] AI 分析中...")
-    analysis = analyze_screenshot(str(temp_path), config)
+    analysis = analyze_screenshot(image_path, config, image_bytes=image_bytes)
+
+    # 分析结果和卡片使用同一个输出文件名前缀
+    output_stem = get_output_stem(image_path, source_key)
 
     # 保存分析结果
     if config['output']['save_analysis_json']:
         # 生成带时间戳和原始文件名的 JSON 文件名
-        original_filename = Path(image_path).stem
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        analysis_filename = f"{original_filename}_{timestamp}_analysis.json"
+        analysis_filename = f"{output_stem}_analysis.json"
         analysis_path = Path(__file__).parent / 'output' / analysis_filename
         with open(analysis_path, 'w', encoding='utf-8') as f:
             json.dump(analysis, f, ensure_ascii=False, indent=2)
@@ -708,11 +1031,7 @@ def process_screenshot(image_path, config):
 
     # 4. 生成卡片
     print("\n[3/3] 生成卡片...")
-    card_html_path = generate_card_html(analysis, image_path, config)
-
-    # 清理临时文件
-    if temp_path.exists():
-        os.remove(temp_path)
+    card_html_path = generate_card_html(analysis, image_path, config, output_stem=output_stem)
 
     print("\n" + "="*60)
     print("✅ 处理完成！")
@@ -720,39 +1039,424 @@ def process_screenshot(image_path, config):
     print(f"\n📂 卡片位置: {card_html_path}")
 
     # 自动打开浏览器
-    if config['output']['auto_open_browser']:
+    if open_browser and config['output']['auto_open_browser']:
         print("\n🌐 正在浏览器中打开...")
+        import webbrowser
         webbrowser.open(f'file://{os.path.abspath(card_html_path)}')
 
     return card_html_path
 
 
+def normalize_inputs(inputs):
+    """把输入路径规范为有序的绝对路径列表，用于识别同一批任务"""
+    return sorted(os.path.abspath(p) for p in inputs)
+
+
+def get_journal_path(inputs):
+    """按输入计算默认的进度日志路径：相同输入对应同一个日志，不同输入互不影响"""
+    digest = hashlib.sha256(json.dumps(normalize_inputs(inputs), ensure_ascii=False).encode('utf-8')).hexdigest()
+    return DEFAULT_JOURNAL_DIR / f"batch_{digest[:12]}.jsonl"
+
+
+class BatchJournal:
+    """
+    批量处理日志（append-only JSONL，每行记录一张图片的一次阶段变化）
+
+    第一行记录本批任务的输入，之后每行为一张图片的阶段变化，依次为
+    preprocessed → done / failed。每条记录写入后立即 fsync，
+    进程在任意时刻崩溃或被杀，重新运行时都能跳过已完成（done）的图片。
+    日志只描述一个未完成的批量任务：任务全部处理完后即删除（见 discard）。
+    """
+
+    def __init__(self, path, inputs):
+        self.path = Path(path)
+        self.inputs = normalize_inputs(inputs)
+        self.stages = {}
+        header = None
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时可能留下写了一半的最后一行，直接忽略
+                        continue
+                    if header is None:
+                        header = entry
+                        continue
+                    self.stages[entry['image']] = entry['stage']
+        if header is not None and header.get('inputs') != self.inputs:
+            raise ValueError(f"进度日志 {self.path} 属于另一批输入，请使用 --fresh 重新开始，或用 --journal 指定其他日志")
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if header is None:
+            self._write({'inputs': self.inputs})
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def is_done(self, image):
+        return self.stages.get(image) == 'done'
+
+    def record(self, image, stage, **extra):
+        self._write({'image': image, 'stage': stage, 'time': datetime.now().isoformat(timespec='seconds'), **extra})
+        self.stages[image] = stage
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        """任务已完成：删除日志，之后对相同输入的运行会重新处理全部图片"""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+def run_in_daemon_thread(func, *args, **kwargs):
+    """
+    在守护线程中执行 func，主线程可随时响应信号并在超时后直接退出
+
+    Returns:
+        (thread, result)：线程结束后 result 中包含 'value' 或 'error'
+    """
+    result = {}
+
+    def target():
+        try:
+            result['value'] = func(*args, **kwargs)
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread, result
+
+
+def process_batch(sources, config, workers=None, journal_path=None, journal_inputs=()):
+    """
+    批量处理：进程池并行压缩，主进程依次调用 API 并生成卡片
+
+    第 N 张图调用 API 时，第 N+1 张及之后的图片已在子进程中压缩，两者重叠执行。
+    sources 为 ImageSource 的可迭代对象（见 iter_image_sources），按需逐个读取。
+
+    传入 journal_path 时会记录每张图片的处理进度：中断或崩溃后重新运行会跳过已完成的图片，
+    全部处理完（包括失败的图片）后日志即被删除。journal_inputs 为产生 sources 的输入路径，
+    日志属于其他输入时拒绝运行。
+    收到 SIGINT / SIGTERM 后不再开始新的图片，等待进行中的 API 调用完成
+    （最多 config['processing']['drain_timeout_s'] 秒，默认 30 秒）后退出；
+    再次按下 Ctrl-C 立即退出。
+
+    Returns:
+        (成功生成的卡片路径列表, 失败图片的 key 列表)
+    """
+    card_paths = []
+    failed = []
+    counts = {'skipped': 0}
+    completed = False
+
+    journal = BatchJournal(journal_path, journal_inputs) if journal_path else None
+
+    def iter_pending():
+        for source in sources:
+            if journal and journal.is_done(source.key):
+                counts['skipped'] += 1
+                continue
+            yield source
+
+    drain_timeout = config['processing'].get('drain_timeout_s', 30)
+    stop = {}
+
+    def handle_signal(signum, frame):
+        if 'at' in stop:
+            raise KeyboardInterrupt
+        stop['at'] = time.monotonic()
+        print(f"\n\n⚠️  收到中断信号，等待进行中的 API 调用完成（最多 {drain_timeout} 秒，再次 Ctrl-C 立即退出）...")
+
+    previous_handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous_handlers[signum] = signal.signal(signum, handle_signal)
+
+    def record_failure(source, error):
+        print(f"\n❌ 处理失败: {source.name}: {str(error)}")
+        failed.append(source.key)
+        if journal:
+            journal.record(source.key, 'failed', error=str(error))
+
+    try:
+        for source, future in iter_preprocessed(iter_pending(), config, workers):
+            if 'at' in stop:
+                break
+            try:
+                preprocessed = future.result()
+            except Exception as e:
+                record_failure(source, e)
+                continue
+            # 等待预处理期间可能收到中断信号，此时不再开始新的 API 调用
+            if 'at' in stop:
+                break
+            if journal:
+                journal.record(source.key, 'preprocessed')
+
+            thread, result = run_in_daemon_thread(process_screenshot, source.name, config,
+                                                  preprocessed=preprocessed, open_browser=False,
+                                                  source_key=source.key)
+            while thread.is_alive():
+                thread.join(0.2)
+                if 'at' in stop and time.monotonic() - stop['at'] > drain_timeout:
+                    break
+            if thread.is_alive():
+                print(f"\n⚠️  等待超时，放弃: {source.name}")
+                break
+
+            if 'error' in result:
+                error = result['error']
+                if not isinstance(error, Exception):
+                    raise error
+                record_failure(source, error)
+            else:
+                card_paths.append(result['value'])
+                if journal:
+                    journal.record(source.key, 'done', card=str(result['value']))
+        else:
+            completed = True
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+        if journal:
+            if completed:
+                journal.discard()
+            else:
+                journal.close()
+
+    if counts['skipped']:
+        print(f"\n⏭️  跳过已完成的 {counts['skipped']} 张图片（日志: {journal.path}）")
+    print(f"\n📊 批量处理完成: 成功 {len(card_paths)} 张，失败 {len(failed)} 张")
+    if not completed:
+        print("   已中断，重新运行相同命令即可继续处理剩余图片")
+    return card_paths, failed
+
+
+def benchmark_startup(runs=5, top=10):
+    """
+    启动性能测试：用 python -X importtime 统计导入 main 模块的耗时
+
+    输出导入总耗时、耗时最多的顶层模块，以及完整进程（python main.py --help）的平均启动时间。
+    """
+    import subprocess
+
+    script_dir = Path(__file__).parent
+
+    # 1. 模块导入耗时（-X importtime 输出到 stderr）
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=script_dir, capture_output=True, text=True
+    )
+    # 每行格式为 "import time: self | cumulative | 缩进+模块名"，子模块先于父模块输出
+    total_us = 0
+    imports = []
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == 'main':
+                total_us = int(cumulative_us)
+                imports = children
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative_us), name.strip()))
+
+    print("\n⏱️  启动性能测试")
+    print(f"   导入 main 模块: {total_us / 1000:.1f}ms")
+    for us, name in sorted(imports, reverse=True)[:top]:
+        print(f"   {us / 1000:>8.1f}ms  {name}")
+
+    # 2. 完整进程启动耗时
+    elapsed = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'main.py', '--help'], cwd=script_dir, capture_output=True)
+        elapsed.append(time.perf_counter() - start)
+    average_ms = sum(elapsed) / len(elapsed) * 1000
+    print(f"   进程启动 (平均 {runs} 次): {average_ms:.1f}ms")
+
+    return total_us / 1000, average_ms
+
+
+def warm_up(config):
+    """预先导入重依赖并创建客户端，供常驻 worker 使用"""
+    import webbrowser  # noqa: F401
+    from jinja2 import Template  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+    get_client(config['api']['api_key'], config['api']['base_url'])
+    get_prompt()
+
+
+def serve_worker(socket_path=DEFAULT_SOCKET_PATH):
+    """
+    常驻 worker：在 Unix socket 上接收 launcher.py 发来的请求
+
+    协议为一行 JSON：请求 {"images": [图片 / 目录 / zip 包路径...]}，响应 {"ok": true, "cards": [...]}
+    或 {"ok": false, "error": "..."}。依赖和 API 客户端在启动时即完成加载，
+    每张截图只剩下压缩、API 调用和渲染本身的开销。
+    """
+    import socketserver
+
+    class WorkerHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                request = json.loads(self.rfile.readline())
+                config = load_config()
+                images = request['images']
+                if is_single_image(images):
+                    response = {'ok': True, 'cards': [str(process_screenshot(images[0], config))]}
+                else:
+                    cards, failed = process_batch(iter_image_sources(images), config)
+                    response = {'ok': not failed, 'cards': [str(p) for p in cards], 'failed': failed}
+            except Exception as e:
+                print(f"\n❌ 错误: {str(e)}")
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        socket_path.unlink()
+
+    warm_up(load_config())
+    print(f"🚀 Worker 已启动: {socket_path}")
+    try:
+        with socketserver.UnixStreamServer(str(socket_path), WorkerHandler) as server:
+            server.serve_forever()
+    finally:
+        if socket_path.exists():
+            socket_path.unlink()
+
+
+def is_single_image(inputs):
+    """判断输入是否为单个图片文件（目录和 zip 包按批量处理）"""
+    return len(inputs) == 1 and not os.path.isdir(inputs[0]) and not is_archive(inputs[0])
+
+
+def positive_int(value):
+    """正整数参数（如 --workers）"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"应为正整数: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"应为正整数: {value}")
+    return number
+
+
+def replay_latency(value):
+    """--replay-latency 参数：秒数，或 recorded 表示使用录制时的实际耗时"""
+    if value == 'recorded':
+        return value
+    try:
+        latency = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"应为秒数或 recorded: {value}")
+    if latency < 0:
+        raise argparse.ArgumentTypeError(f"延迟不能为负数: {value}")
+    return latency
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='截屏智能卡片生成器')
+    parser.add_argument('images', nargs='*', help='截图、目录或 zip 包路径（可多个），为空时从 input/ 文件夹读取')
+    parser.add_argument('--batch', action='store_true', help='批量处理全部图片（默认只处理一张）')
+    parser.add_argument('--workers', type=positive_int, help='预处理进程数（默认使用全部 CPU 核心）')
+    parser.add_argument('--journal', help='批量处理进度日志路径（默认按输入生成于 output/journals/，中断后重新运行可断点续跑）')
+    parser.add_argument('--fresh', action='store_true', help='放弃上次未完成的任务，重新处理全部图片')
+    parser.add_argument('--bench-preprocess', action='store_true', help='测试 1/4/全部核心下的预处理速度')
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record', action='store_true', help='录制 API 响应到本地（用于离线回放）')
+    cassette_group.add_argument('--replay', action='store_true', help='回放已录制的 API 响应，不调用 API')
+    parser.add_argument('--cassette-dir', help='API 响应录制目录（默认 output/cassettes）')
+    parser.add_argument('--replay-latency', type=replay_latency, help='回放时模拟的延迟秒数，或 recorded 使用录制时的实际耗时')
+    parser.add_argument('--bench-startup', action='store_true', help='测试模块导入和进程启动耗时')
+    parser.add_argument('--serve', action='store_true', help='以常驻 worker 模式运行，配合 launcher.py 使用')
+    parser.add_argument('--socket', default=str(DEFAULT_SOCKET_PATH), help='常驻 worker 的 Unix socket 路径')
+    return parser.parse_args()
+
+
 def main():
     """命令行入口"""
+    args = parse_args()
+
+    if args.bench_startup:
+        benchmark_startup()
+        return
+    if args.serve:
+        try:
+            serve_worker(args.socket)
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Worker 已停止")
+        return
+
     # 加载配置
     config = load_config()
 
-    # 获取输入图片路径
-    if len(sys.argv) > 1:
-        image_path = sys.argv[1]
-    else:
-        # 默认从 input 目录读取
-        input_dir = Path(__file__).parent / 'input'
-        images = list(input_dir.glob('*.jpg')) + list(input_dir.glob('*.png')) + list(input_dir.glob('*.jpeg'))
-
-        if not images:
-            print("❌ 错误: 未找到输入图片")
-            print("\n使用方法:")
-            print("  python main.py <图片路径>")
-            print("  或将图片放入 input/ 文件夹")
-            sys.exit(1)
+    # 命令行的录制 / 回放参数覆盖配置文件
+    if args.record or args.replay or args.cassette_dir or args.replay_latency is not None:
+        cassette = dict(config['api'].get('cassette', {}))
+        if args.record or args.replay:
+            cassette['mode'] = 'record' if args.record else 'replay'
+        if args.cassette_dir:
+            cassette['dir'] = args.cassette_dir
+        if args.replay_latency is not None:
+            cassette['replay_latency_s'] = args.replay_latency
+        config = dict(config, api=dict(config['api'], cassette=cassette))
 
-        image_path = str(images[0])
-        print(f"📌 自动选择: {os.path.basename(image_path)}")
+    # 获取输入：图片、目录或 zip 包，默认读取 input 目录
+    inputs = args.images or [str(Path(__file__).parent / 'input')]
 
     try:
-        # 处理截图
-        process_screenshot(image_path, config)
+        # 提前校验录制 / 回放模式，避免处理到一半才报错
+        get_cassette_mode(config)
+
+        if args.bench_preprocess:
+            benchmark_preprocess(iter_image_sources(inputs), config)
+        elif args.batch or (args.images and not is_single_image(args.images)):
+            # 批量处理（图片逐个从目录 / zip 包中流式读取）
+            # 回放不调用 API、可随时完整重跑，不使用也不影响进度日志
+            journal_path = None
+            if get_cassette_mode(config) != 'replay':
+                journal_path = args.journal or get_journal_path(inputs)
+            if journal_path and args.fresh and os.path.exists(journal_path):
+                os.remove(journal_path)
+            _, failed = process_batch(iter_image_sources(inputs), config, workers=args.workers,
+                                      journal_path=journal_path, journal_inputs=inputs)
+            if failed:
+                sys.exit(1)
+        elif args.images:
+            # 处理截图
+            process_screenshot(args.images[0], config)
+        else:
+            # 保持迭代器打开直到读取完成（zip 包在迭代器关闭时随之关闭）
+            sources = iter_image_sources(inputs)
+            source = next(sources, None)
+            if source is None:
+                print("❌ 错误: 未找到输入图片")
+                print("\n使用方法:")
+                print("  python main.py <图片路径>")
+                print("  python main.py --batch [图片 / 目录 / zip 包路径...]")
+                print("  或将图片放入 input/ 文件夹")
+                sys.exit(1)
+            print(f"📌 自动选择: {source.name}")
+            try:
+                image_bytes = source.read()
+            finally:
+                sources.close()
+            preprocessed = preprocess_image_bytes(image_bytes, config['processing'])
+            process_screenshot(source.name, config, preprocessed=preprocessed, source_key=source.key)
 
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断")